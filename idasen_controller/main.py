@@ -2,6 +2,7 @@
 import os
 import sys
 import shutil
+import signal
 import struct
 import argparse
 import yaml
@@ -11,6 +12,18 @@ import json
 import functools
 from appdirs import user_config_dir
 
+try:
+    # The LibYAML based loader is much faster, but is not always available
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    # uvloop is optional but gives a faster event loop where it is installed
+    import uvloop
+except ImportError:
+    uvloop = None
+
 IS_LINUX = sys.platform == "linux" or sys.platform == "linux2"
 IS_WINDOWS = sys.platform == "win32"
 IS_MAC = sys.platform == "darwin"
@@ -36,10 +49,24 @@ UUID_HEIGHT = "99fa0021-338a-1024-8a49-009c0215f78a"
 UUID_COMMAND = "99fa0002-338a-1024-8a49-009c0215f78a"
 UUID_REFERENCE_INPUT = "99fa0031-338a-1024-8a49-009c0215f78a"
 
-COMMAND_UP = bytearray(struct.pack("<H", 71))
-COMMAND_DOWN = bytearray(struct.pack("<H", 70))
-COMMAND_STOP = bytearray(struct.pack("<H", 255))
-COMMAND_REFERENCE_INPUT_STOP = bytearray(struct.pack("<H", 32769))
+# Characteristics resolved from the UUIDs once connected, so bleak does not have
+# to look them up again for every read and write
+characteristics = {
+    UUID_HEIGHT: UUID_HEIGHT,
+    UUID_COMMAND: UUID_COMMAND,
+    UUID_REFERENCE_INPUT: UUID_REFERENCE_INPUT,
+}
+
+COMMAND_UP = struct.pack("<H", 71)
+COMMAND_DOWN = struct.pack("<H", 70)
+COMMAND_STOP = struct.pack("<H", 255)
+COMMAND_REFERENCE_INPUT_STOP = struct.pack("<H", 32769)
+
+# How often movement commands are resent while moving (seconds)
+RESEND_INTERVAL = 0.2
+
+# Height notifications are a raw height and speed, unpacked on every update
+_HEIGHT_STRUCT = struct.Struct("<Hh")
 
 # OTHER DEFINITIONS
 DEFAULT_CONFIG_DIR = user_config_dir("idasen-controller")
@@ -47,14 +74,6 @@ DEFAULT_CONFIG_PATH = os.path.join(DEFAULT_CONFIG_DIR, "config.yaml")
 
 # CONFIGURATION SETUP
 
-# Default config
-if not os.path.isfile(DEFAULT_CONFIG_PATH):
-    os.makedirs(os.path.dirname(DEFAULT_CONFIG_PATH), exist_ok=True)
-    shutil.copyfile(
-        os.path.join(os.path.dirname(__file__), "example", "config.yaml"),
-        DEFAULT_CONFIG_PATH,
-    )
-
 # Height of the desk at it's lowest (in mm)
 DEFAULT_BASE_HEIGHT = 620
 # And how high it can rise above that (same for all desks)
@@ -76,201 +95,235 @@ config = {
     "monitor": False,
     "move_to": None,
     "move_to_raw": None,
+    "forward": False,
+    "scan_adapter": False,
+    "server": False,
     "server_address": "127.0.0.1",
     "server_port": 9123,
 }
 
-parser = argparse.ArgumentParser(description="")
-parser.add_argument(
-    "--mac-address", dest="mac_address", type=str, help="Mac address of the Idasen desk"
-)
-parser.add_argument(
-    "--base-height",
-    dest="base_height",
-    type=int,
-    help="The height of tabletop above ground at lowest position (mm)",
-)
-parser.add_argument(
-    "--movement-range",
-    dest="movement_range",
-    type=int,
-    help="How far above base-height the desk can extend (mm)",
-)
-parser.add_argument(
-    "--stand-height",
-    dest="stand_height",
-    type=int,
-    help="The height the desk should be at when standing (mm)",
-)
-parser.add_argument(
-    "--sit-height",
-    dest="sit_height",
-    type=int,
-    help="The height the desk should be at when sitting (mm)",
-)
-parser.add_argument(
-    "--stand-height-offset",
-    dest="stand_height_offset",
-    type=int,
-    help="The height above base height the desk should be at when standing (mm)",
-)
-parser.add_argument(
-    "--sit-height-offset",
-    dest="sit_height_offset",
-    type=int,
-    help="The height above base height the desk should be at when sitting (mm)",
-)
-parser.add_argument(
-    "--height-tolerance",
-    dest="height_tolerance",
-    type=float,
-    help="Distance between reported height and target height before ceasing move commands (mm)",
-)
-parser.add_argument(
-    "--adapter", dest="adapter_name", type=str, help="The bluetooth adapter device name"
-)
-parser.add_argument(
-    "--scan-timeout",
-    dest="scan_timeout",
-    type=int,
-    help="The timeout for bluetooth scan (seconds)",
-)
-parser.add_argument(
-    "--connection-timeout",
-    dest="connection_timeout",
-    type=int,
-    help="The timeout for bluetooth connection (seconds)",
-)
-parser.add_argument(
-    "--movement-timeout",
-    dest="movement_timeout",
-    type=int,
-    help="The timeout for waiting for the desk to reach the specified height (seconds)",
-)
-parser.add_argument(
-    "--forward",
-    dest="forward",
-    action="store_true",
-    help="Forward any commands to a server",
-)
-parser.add_argument(
-    "--server-address",
-    dest="server_address",
-    type=str,
-    help="The address the server should run at",
-)
-parser.add_argument(
-    "--server_port",
-    dest="server_port",
-    type=int,
-    help="The port the server should run on",
-)
-parser.add_argument(
-    "--config",
-    dest="config",
-    type=str,
-    help="File path to the config file (Default: {})".format(DEFAULT_CONFIG_PATH),
-    default=DEFAULT_CONFIG_PATH,
-)
-cmd = parser.add_mutually_exclusive_group()
-cmd.add_argument(
-    "--sit", dest="sit", action="store_true", help="Move the desk to sitting height"
-)
-cmd.add_argument(
-    "--stand",
-    dest="stand",
-    action="store_true",
-    help="Move the desk to standing height",
-)
-cmd.add_argument(
-    "--monitor",
-    dest="monitor",
-    action="store_true",
-    help="Monitor desk height and speed",
-)
-cmd.add_argument(
-    "--move-to", dest="move_to", type=int, help="Move desk to specified height (mm)"
-)
-cmd.add_argument(
-    "--scan",
-    dest="scan_adapter",
-    action="store_true",
-    help="Scan for devices using the configured adapter",
-)
-cmd.add_argument(
-    "--server",
-    dest="server",
-    action="store_true",
-    help="Run as a server to accept forwarded commands",
-)
-
-args = {k: v for k, v in vars(parser.parse_args()).items() if v is not None}
-
-# Overwrite config from config.yaml
-config_file = {}
-config_file_path = os.path.join(args["config"])
-if config_file_path and os.path.isfile(config_file_path):
+# Recomputed from the config by load_config()
+BASE_HEIGHT = DEFAULT_BASE_HEIGHT
+MAX_HEIGHT = DEFAULT_BASE_HEIGHT + DEFAULT_MOVEMENT_RANGE
+
+
+@functools.lru_cache(maxsize=1)
+def read_config_file(config_file_path):
+    """Read the config file, if there is one"""
+    if not os.path.isfile(config_file_path):
+        print("No config file found")
+        return {}
     with open(config_file_path, "r") as stream:
         try:
-            config_file = yaml.safe_load(stream)
+            # An empty file loads as None
+            return yaml.load(stream, Loader=SafeLoader) or {}
         except yaml.YAMLError as exc:
             print("Reading config.yaml failed")
             exit(1)
-else:
-    print("No config file found")
-config.update(config_file)
 
-# Overwrite config from command line args
-config.update(args)
 
-# recompute base and max height
-BASE_HEIGHT = config["base_height"]
-MAX_HEIGHT = BASE_HEIGHT + config["movement_range"]
+def load_config():
+    """Build the config from defaults, the config file and command line args"""
+    # Default config
+    if not os.path.isfile(DEFAULT_CONFIG_PATH):
+        os.makedirs(os.path.dirname(DEFAULT_CONFIG_PATH), exist_ok=True)
+        shutil.copyfile(
+            os.path.join(os.path.dirname(__file__), "example", "config.yaml"),
+            DEFAULT_CONFIG_PATH,
+        )
+
+    parser = argparse.ArgumentParser(description="", argument_default=argparse.SUPPRESS)
+    parser.add_argument(
+        "--mac-address",
+        dest="mac_address",
+        type=str,
+        help="Mac address of the Idasen desk",
+    )
+    parser.add_argument(
+        "--base-height",
+        dest="base_height",
+        type=int,
+        help="The height of tabletop above ground at lowest position (mm)",
+    )
+    parser.add_argument(
+        "--movement-range",
+        dest="movement_range",
+        type=int,
+        help="How far above base-height the desk can extend (mm)",
+    )
+    parser.add_argument(
+        "--stand-height",
+        dest="stand_height",
+        type=int,
+        help="The height the desk should be at when standing (mm)",
+    )
+    parser.add_argument(
+        "--sit-height",
+        dest="sit_height",
+        type=int,
+        help="The height the desk should be at when sitting (mm)",
+    )
+    parser.add_argument(
+        "--stand-height-offset",
+        dest="stand_height_offset",
+        type=int,
+        help="The height above base height the desk should be at when standing (mm)",
+    )
+    parser.add_argument(
+        "--sit-height-offset",
+        dest="sit_height_offset",
+        type=int,
+        help="The height above base height the desk should be at when sitting (mm)",
+    )
+    parser.add_argument(
+        "--height-tolerance",
+        dest="height_tolerance",
+        type=float,
+        help="Distance between reported height and target height before ceasing move commands (mm)",
+    )
+    parser.add_argument(
+        "--adapter",
+        dest="adapter_name",
+        type=str,
+        help="The bluetooth adapter device name",
+    )
+    parser.add_argument(
+        "--scan-timeout",
+        dest="scan_timeout",
+        type=int,
+        help="The timeout for bluetooth scan (seconds)",
+    )
+    parser.add_argument(
+        "--connection-timeout",
+        dest="connection_timeout",
+        type=int,
+        help="The timeout for bluetooth connection (seconds)",
+    )
+    parser.add_argument(
+        "--movement-timeout",
+        dest="movement_timeout",
+        type=int,
+        help="The timeout for waiting for the desk to reach the specified height (seconds)",
+    )
+    parser.add_argument(
+        "--forward",
+        dest="forward",
+        action="store_true",
+        help="Forward any commands to a server",
+    )
+    parser.add_argument(
+        "--server-address",
+        dest="server_address",
+        type=str,
+        help="The address the server should run at",
+    )
+    parser.add_argument(
+        "--server_port",
+        dest="server_port",
+        type=int,
+        help="The port the server should run on",
+    )
+    parser.add_argument(
+        "--config",
+        dest="config",
+        type=str,
+        help="File path to the config file (Default: {})".format(DEFAULT_CONFIG_PATH),
+        default=DEFAULT_CONFIG_PATH,
+    )
+    cmd = parser.add_mutually_exclusive_group()
+    cmd.add_argument(
+        "--sit", dest="sit", action="store_true", help="Move the desk to sitting height"
+    )
+    cmd.add_argument(
+        "--stand",
+        dest="stand",
+        action="store_true",
+        help="Move the desk to standing height",
+    )
+    cmd.add_argument(
+        "--monitor",
+        dest="monitor",
+        action="store_true",
+        help="Monitor desk height and speed",
+    )
+    cmd.add_argument(
+        "--move-to", dest="move_to", type=int, help="Move desk to specified height (mm)"
+    )
+    cmd.add_argument(
+        "--scan",
+        dest="scan_adapter",
+        action="store_true",
+        help="Scan for devices using the configured adapter",
+    )
+    cmd.add_argument(
+        "--server",
+        dest="server",
+        action="store_true",
+        help="Run as a server to accept forwarded commands",
+    )
+
+    args = vars(parser.parse_args())
+
+    # Overwrite config from config.yaml
+    config.update(read_config_file(args["config"]))
 
-if not config["mac_address"]:
-    parser.error("Mac address must be provided")
+    # Overwrite config from command line args
+    config.update(args)
 
-if config["sit_height"] >= config["stand_height"]:
-    parser.error("Sit height must be less than stand height")
+    # recompute base and max height
+    global BASE_HEIGHT, MAX_HEIGHT
+    BASE_HEIGHT = config["base_height"]
+    MAX_HEIGHT = BASE_HEIGHT + config["movement_range"]
 
-if config["sit_height"] < BASE_HEIGHT:
-    parser.error("Sit height must be greater than {}".format(BASE_HEIGHT))
+    # Scanning is how you find the mac address so it is not needed for that
+    if not config["mac_address"] and not config["scan_adapter"]:
+        parser.error("Mac address must be provided")
 
-if config["stand_height"] > MAX_HEIGHT:
-    parser.error("Stand height must be less than {}".format(MAX_HEIGHT))
+    if config["sit_height"] >= config["stand_height"]:
+        parser.error("Sit height must be less than stand height")
 
-if "sit_height_offset" in config:
-    if not (0 <= config["sit_height_offset"] <= config["movement_range"]):
-        parser.error(
-            "Sit height offset must be within [0, {}]".format(config["movement_range"])
-        )
-    config["sit_height"] = BASE_HEIGHT + config["sit_height_offset"]
+    if config["sit_height"] < BASE_HEIGHT:
+        parser.error("Sit height must be greater than {}".format(BASE_HEIGHT))
+
+    if config["stand_height"] > MAX_HEIGHT:
+        parser.error("Stand height must be less than {}".format(MAX_HEIGHT))
 
-if "stand_height_offset" in config:
-    if not (0 <= config["stand_height_offset"] <= config["movement_range"]):
-        parser.error(
-            "Stand height offset must be within [0, {}]".format(
-                config["movement_range"]
+    if "sit_height_offset" in config:
+        if not (0 <= config["sit_height_offset"] <= config["movement_range"]):
+            parser.error(
+                "Sit height offset must be within [0, {}]".format(
+                    config["movement_range"]
+                )
             )
-        )
-    config["stand_height"] = BASE_HEIGHT + config["stand_height_offset"]
+        config["sit_height"] = BASE_HEIGHT + config["sit_height_offset"]
+
+    if "stand_height_offset" in config:
+        if not (0 <= config["stand_height_offset"] <= config["movement_range"]):
+            parser.error(
+                "Stand height offset must be within [0, {}]".format(
+                    config["movement_range"]
+                )
+            )
+        config["stand_height"] = BASE_HEIGHT + config["stand_height_offset"]
 
-config["mac_address"] = config["mac_address"].upper()
-config["stand_height_raw"] = mmToRaw(config["stand_height"])
-config["sit_height_raw"] = mmToRaw(config["sit_height"])
-config["height_tolerance_raw"] = 10 * config["height_tolerance"]
-if config["move_to"]:
-    config["move_to_raw"] = mmToRaw(config["move_to"])
+    if config["mac_address"]:
+        config["mac_address"] = config["mac_address"].upper()
+    config["stand_height_raw"] = mmToRaw(config["stand_height"])
+    config["sit_height_raw"] = mmToRaw(config["sit_height"])
+    config["height_tolerance_raw"] = 10 * config["height_tolerance"]
+    if config["move_to"]:
+        config["move_to_raw"] = mmToRaw(config["move_to"])
+
+    if IS_WINDOWS:
+        # Windows doesn't use this parameter so rename it so it looks nice for the logs
+        config["adapter_name"] = "default adapter"
 
-if IS_WINDOWS:
-    # Windows doesn't use this parameter so rename it so it looks nice for the logs
-    config["adapter_name"] = "default adapter"
 
 # MAIN PROGRAM
 
 
 def print_height_data(sender, data):
-    height, speed = struct.unpack("<Hh", data)
+    height, speed = _HEIGHT_STRUCT.unpack(data)
     print(
         "Height: {:4.0f}mm Speed: {:2.0f}mm/s".format(
             rawToMM(height), rawToSpeed(speed)
@@ -284,20 +337,55 @@ def has_reached_target(height, target):
     return abs(height - target) <= config["height_tolerance_raw"]
 
 
+async def read_height(client):
+    """Read the current raw height and speed of the desk"""
+    # Windows may otherwise return a cached value rather than reading the desk
+    kwargs = {"use_cached": False} if IS_WINDOWS else {}
+    return _HEIGHT_STRUCT.unpack(
+        await client.read_gatt_char(characteristics[UUID_HEIGHT], **kwargs)
+    )
+
+
 async def move_up(client):
-    await client.write_gatt_char(UUID_COMMAND, COMMAND_UP)
+    await client.write_gatt_char(
+        characteristics[UUID_COMMAND], COMMAND_UP, response=False
+    )
 
 
 async def move_down(client):
-    await client.write_gatt_char(UUID_COMMAND, COMMAND_DOWN)
+    await client.write_gatt_char(
+        characteristics[UUID_COMMAND], COMMAND_DOWN, response=False
+    )
+
+
+async def resend_movement(client, direction, move_done):
+    """Keep sending movement commands until the move is done"""
+    # Each movement command seems to run the desk motors for about 1 second if
+    # uninterrupted. Resending the command well within that second prevents
+    # stuttering (the motor seems to slow if no new move command has been
+    # sent). The commands are written without response so they are not held
+    # up waiting for the desk to acknowledge the previous one.
+    move = move_up if direction == "UP" else move_down
+    while not move_done.is_set():
+        await move(client)
+        await asyncio.sleep(RESEND_INTERVAL)
 
 
 async def stop(client):
     # This emulates the behaviour of the app. Stop commands are sent to both
-    # Reference Input and Command characteristics.
+    # Reference Input and Command characteristics. They are written without
+    # response and together so the desk gets them as soon as possible.
     try:
-        await client.write_gatt_char(UUID_COMMAND, COMMAND_STOP)
-        await client.write_gatt_char(UUID_REFERENCE_INPUT, COMMAND_REFERENCE_INPUT_STOP)
+        await asyncio.gather(
+            client.write_gatt_char(
+                characteristics[UUID_COMMAND], COMMAND_STOP, response=False
+            ),
+            client.write_gatt_char(
+                characteristics[UUID_REFERENCE_INPUT],
+                COMMAND_REFERENCE_INPUT_STOP,
+                response=False,
+            ),
+        )
     except BleakError as e:
         # This seems to result in a an error on Raspberry Pis but it does not affect movement
         # bleak.exc.BleakDBusError: [org.bluez.Error.NotPermitted] Write acquired
@@ -306,12 +394,12 @@ async def stop(client):
 
 async def subscribe(client, uuid, callback):
     """Listen for notifications on a characteristic"""
-    await client.start_notify(uuid, callback)
+    await client.start_notify(characteristics[uuid], callback)
 
 
 async def unsubscribe(client, uuid):
     try:
-        await client.stop_notify(uuid)
+        await client.stop_notify(characteristics[uuid])
     except KeyError:
         # This happens on windows, I don't know why
         pass
@@ -320,75 +408,74 @@ async def unsubscribe(client, uuid):
 async def move_to(client, target):
     """Move the desk to a specified height"""
 
-    initial_height, speed = struct.unpack(
-        "<Hh", await client.read_gatt_char(UUID_HEIGHT)
-    )
+    initial_height, speed = await read_height(client)
 
     # Initialise by setting the movement direction
     direction = "UP" if target > initial_height else "DOWN"
 
-    # Set up callback to run when the desk height changes. It will resend
-    # movement commands until the desk has reached the target height.
-    loop = asyncio.get_event_loop()
-    move_done = loop.create_future()
-    global count
-    count = 0
+    # Set up callback to run when the desk height changes. Notifications can
+    # arrive faster than they are handled but only the latest height matters,
+    # so the callback just stores it and wakes _follow_height to check it.
+    latest = None
+    new_sample = asyncio.Event()
 
     def _move_to(sender, data):
-        global count
-        height, speed = struct.unpack("<Hh", data)
-        count = count + 1
-        print(
-            "Height: {:4.0f}mm Target: {:4.0f}mm Speed: {:2.0f}mm/s".format(
-                rawToMM(height), rawToMM(target), rawToSpeed(speed)
+        nonlocal latest
+        latest = data
+        new_sample.set()
+
+    # This runs for each handled notification so anything that does not change
+    # during the move is worked out up front.
+    move_done = asyncio.Event()
+    unpack = _HEIGHT_STRUCT.unpack
+    base_height = BASE_HEIGHT
+    target_mm = rawToMM(target)
+    tolerance = config["height_tolerance_raw"]
+
+    async def _follow_height():
+        while True:
+            await new_sample.wait()
+            new_sample.clear()
+            height, speed = unpack(latest)
+            print(
+                "Height: {:4.0f}mm Target: {:4.0f}mm Speed: {:2.0f}mm/s".format(
+                    height / 10 + base_height, target_mm, speed / 100
+                )
             )
-        )
 
-        # Stop if we have reached the target OR
-        # If you touch desk control while the script is running then movement
-        # callbacks stop. The final call will have speed 0 so detect that
-        # and stop.
-        if speed == 0 or has_reached_target(height, target):
-            asyncio.create_task(stop(client))
-            asyncio.create_task(unsubscribe(client, UUID_HEIGHT))
-            try:
-                move_done.set_result(True)
-            except asyncio.InvalidStateError:
-                # This happens on windows, I dont know why
-                pass
-        # Or resend the movement command if we have not yet reached the
-        # target.
-        # Each movement command seems to run the desk motors for about 1
-        # second if uninterrupted and the height value is updated about 16
-        # times.
-        # Resending the command on the 6th update seems a good balance
-        # between helping to avoid overshoots and preventing stutterinhg
-        # (the motor seems to slow if no new move command has been sent)
-        elif direction == "UP" and count == 6:
-            asyncio.create_task(move_up(client))
-            count = 0
-        elif direction == "DOWN" and count == 6:
-            asyncio.create_task(move_down(client))
-            count = 0
-
-    # Listen for changes to desk height and send first move command (if we are
-    # not already at the target height).
+            # Stop if we have reached the target OR
+            # If you touch desk control while the script is running then
+            # movement callbacks stop. The final call will have speed 0 so
+            # detect that and stop. (See has_reached_target, inlined here.)
+            if speed == 0 or abs(height - target) <= tolerance:
+                move_done.set()
+                await stop(client)
+                return
+
+    # Listen for changes to desk height and keep sending move commands (if we
+    # are not already at the target height).
     if not has_reached_target(initial_height, target):
         await subscribe(client, UUID_HEIGHT, _move_to)
-        if direction == "UP":
-            asyncio.create_task(move_up(client))
-        elif direction == "DOWN":
-            asyncio.create_task(move_down(client))
+        resend = asyncio.create_task(resend_movement(client, direction, move_done))
         try:
-            await asyncio.wait_for(move_done, timeout=config["movement_timeout"])
+            await asyncio.wait_for(_follow_height(), timeout=config["movement_timeout"])
         except asyncio.TimeoutError as e:
             print("Timed out while waiting for desk")
+        finally:
+            move_done.set()
+            resend.cancel()
             await unsubscribe(client, UUID_HEIGHT)
 
 
-async def scan():
+async def scan(mac_address=None):
     """Scan for a bluetooth device with the configured address and return it or return all devices if no address specified"""
     print("Scanning\r", end="")
+    if mac_address:
+        # Returns as soon as the device is seen rather than waiting for the
+        # whole timeout
+        return await BleakScanner.find_device_by_address(
+            mac_address, device=config["adapter_name"], timeout=config["scan_timeout"]
+        )
     devices = await BleakScanner().discover(
         device=config["adapter_name"], timeout=config["scan_timeout"]
     )
@@ -401,16 +488,21 @@ async def scan():
 async def connect(client=None, attempt=0):
     """Attempt to connect to the desk"""
     try:
-        print("Connecting\r", end="")
         if not client:
-            client = BleakClient(config["mac_address"], device=config["adapter_name"])
+            device = await scan(config["mac_address"])
+            if not device:
+                raise BleakError("Could not find desk {}".format(config["mac_address"]))
+            client = BleakClient(device, device=config["adapter_name"])
+        print("Connecting\r", end="")
         await client.connect(timeout=config["connection_timeout"])
+        for uuid in characteristics:
+            characteristics[uuid] = client.services.get_characteristic(uuid) or uuid
         print("Connected {}".format(config["mac_address"]))
         return client
     except BleakError as e:
         print("Connecting failed")
         print(e)
-        os._exit(1)
+        return None
 
 
 async def disconnect(client):
@@ -422,17 +514,14 @@ async def disconnect(client):
 async def run_command(client, config):
     """Begin the action specified by command line arguments and config"""
     # Always print current height
-    initial_height, speed = struct.unpack(
-        "<Hh", await client.read_gatt_char(UUID_HEIGHT)
-    )
+    initial_height, speed = await read_height(client)
     print("Height: {:4.0f}mm".format(rawToMM(initial_height)))
     target = None
     if config["monitor"]:
         # Print changes to height data
         await subscribe(client, UUID_HEIGHT, print_height_data)
-        loop = asyncio.get_event_loop()
-        wait = loop.create_future()
-        await wait
+        # Sleep until cancelled (e.g. by Ctrl-C)
+        await asyncio.Event().wait()
     elif config["sit"]:
         # Move to configured sit height
         target = config["sit_height_raw"]
@@ -452,9 +541,7 @@ async def run_command(client, config):
     if target:
         # If we were moving to a target height, wait, then print the actual final height
         await asyncio.sleep(1)
-        final_height, speed = struct.unpack(
-            "<Hh", await client.read_gatt_char(UUID_HEIGHT)
-        )
+        final_height, speed = await read_height(client)
         print(
             "Final height: {:4.0f}mm (Target: {:4.0f}mm)".format(
                 rawToMM(final_height), rawToMM(target)
@@ -465,13 +552,21 @@ async def run_command(client, config):
 async def run_server(client, config):
     """Start a tcp server to listen for commands"""
 
+    # Only one command (or reconnection attempt) should use the desk at a time
+    lock = asyncio.Lock()
+
+    async def reconnect():
+        async with lock:
+            if not client.is_connected:
+                await connect(client)
+
     def disconnect_callback(client, _=None):
         print("Lost connection with {}".format(client.address))
-        asyncio.create_task(connect(client))
+        asyncio.create_task(reconnect())
 
     client.set_disconnected_callback(disconnect_callback)
     server = await asyncio.start_server(
-        functools.partial(run_forwarded_command, client, config),
+        functools.partial(run_forwarded_command, client, config, lock),
         config["server_address"],
         config["server_port"],
     )
@@ -479,14 +574,20 @@ async def run_server(client, config):
     await server.serve_forever()
 
 
-async def run_forwarded_command(client, config, reader, writer):
+async def run_forwarded_command(client, config, lock, reader, writer):
     """Run commands received by the tcp server"""
     print("Received command")
-    request = (await reader.read()).decode("utf8")
-    forwarded_config = json.loads(str(request))
-    merged_config = {**config, **forwarded_config}
-    await run_command(client, merged_config)
-    writer.close()
+    try:
+        request = (await reader.read()).decode("utf8")
+        forwarded_config = json.loads(str(request))
+        merged_config = {**config, **forwarded_config}
+        async with lock:
+            if not client.is_connected and not await connect(client):
+                # The connection was lost and could not be re-established
+                return
+            await run_command(client, merged_config)
+    finally:
+        writer.close()
 
 
 async def forward_command(config):
@@ -497,11 +598,25 @@ async def forward_command(config):
         config["server_address"], config["server_port"]
     )
     writer.write(json.dumps(forwarded_config).encode())
+    await writer.drain()
     writer.close()
+    await writer.wait_closed()
 
 
 async def main():
     """Set up the async event loop and signal handlers"""
+    # Cancel on Ctrl-C (or SIGTERM) so the finally block below still gets to
+    # stop the desk and disconnect, rather than leaving the connection open
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    if IS_WINDOWS:
+        # The loop can't install signal handlers on Windows
+        signal.signal(
+            signal.SIGINT, lambda *args: loop.call_soon_threadsafe(task.cancel)
+        )
+    else:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, task.cancel)
     try:
         client = None
         # Forward and scan don't require a connection so run them and exit
@@ -512,6 +627,8 @@ async def main():
         else:
             # Server and other commands do require a connection so set one up
             client = await connect()
+            if not client:
+                return 1
             if config["server"]:
                 await run_server(client, config)
             else:
@@ -528,10 +645,26 @@ async def main():
 
 
 def init():
+    load_config()
+    exit_code = 0
     try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
+        if hasattr(asyncio, "Runner"):
+            # Python 3.11+: configure the loop before main() starts on it
+            loop_factory = uvloop.new_event_loop if uvloop else None
+            with asyncio.Runner(loop_factory=loop_factory) as runner:
+                loop = runner.get_loop()
+                if hasattr(asyncio, "eager_task_factory"):
+                    # Python 3.12+: start tasks (e.g. movement commands)
+                    # immediately rather than waiting for the next loop iteration
+                    loop.set_task_factory(asyncio.eager_task_factory)
+                exit_code = runner.run(main())
+        else:
+            if uvloop:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            exit_code = asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
         pass
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
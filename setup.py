@@ -27,6 +27,7 @@ setup(
     ),
     keywords="python package idasen-controller idasen linak standing desk",
     install_requires=requirements,
+    extras_require={"uvloop": ["uvloop"]},
     zip_safe=False,
     include_package_data=True,
     package_data={"": ["example/*"]},